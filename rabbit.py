@@ -1,56 +1,113 @@
 import random
-import requests
+import re
+import threading
+import requests_cache
+from requests_cache import DO_NOT_CACHE
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import streamlit as st
-from bs4 import BeautifulSoup
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from streamlit.runtime.scriptrunner.script_run_context import SCRIPT_RUN_CONTEXT_ATTR_NAME
 from urllib.parse import quote, unquote
 from html import escape
-from time import sleep
+from concurrent.futures import ThreadPoolExecutor
+
+try: # selectolax (lexbor) is much faster for plain anchor extraction
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+try: # lxml can walk the links straight from C without a soup tree
+    import lxml.html
+except ImportError:
+    lxml = None
+
+try: # orjson decodes straight from bytes, faster than stdlib json
+    import orjson
+except ImportError:
+    orjson = None
+
+try: # only advertise brotli when urllib3 can actually decode it
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "br, gzip"
+except ImportError:
+    ACCEPT_ENCODING = "gzip"
+
+if LexborHTMLParser is None and lxml is None:
+    from bs4 import BeautifulSoup, SoupStrainer
 
 WIKI_REST = "https://en.wikipedia.org/api/rest_v1"
 WIKI_BASE = "https://en.wikipedia.org"
+LEADS_SHOWN = 5
+LEAD_POOL_SIZE = 60 # candidates kept per page so Shuffle never refetches
+_NOTE_TPL = '''
+<div class="note">
+    <div class="title">{t}</div>
+    <div class="extract">{e}</div>
+    <a href="{u}" target="_blank" rel="noopener">Open on Wikipedia</a>
+</div>
+'''
+_SUMMARY_TPL = f"{WIKI_REST}/page/summary/{{}}"
+_HTML_TPL = f"{WIKI_REST}/page/html/{{}}"
 
-SESSION = requests.Session()
-SESSION.headers.update({ #default headers
-    "User-Agent": "WikiCorkboard/1.1 (contact: your_email@example.com)",
-    "Accept": "application/json, text/html;q=0.9"
-})
+def _qtitle(title: str): # path-safe title for the URL templates, "/" included
+    return quote(title, safe="")
 
-def _get(url, tries=3, timeout=12): # helper to retry
-    last_err = None
-    for i in range(tries):
-        try:
-            r = SESSION.get(url, timeout=timeout)
-            if r.status_code in (429, 503):
-                ra = r.headers.get("Retry-After")
-                if ra:
-                    try:
-                        sleep(float(ra))
-                    except Exception:
-                        sleep(1.5 * (i + 1))
-                else:
-                    sleep(1.5 * (i + 1))
-                last_err = requests.HTTPError(f"{r.status_code} on {url}")
-                continue
-            r.raise_for_status()
-            return r
-        except requests.RequestException as e:
-            last_err = e
-            sleep(0.5 * (i + 1))
-    raise last_err if last_err else RuntimeError("Unknown HTTP error")
+_HREF_RE = re.compile(r"^(?:/wiki/|\./)([^:#?]+)(?:[#?]|$)") # article path, no namespace
+_BAD_LABELS = frozenset({"edit", "citation needed", "help", "see also"})
+_CHROME_CSS = "sup.reference, table.infobox, .navbox" # never useful as leads
+_CHROME_XPATH = ('//sup[contains(@class,"reference")] | //table[contains(@class,"infobox")]'
+                 ' | //*[contains(@class,"navbox")]')
+
+@st.cache_resource(show_spinner=False)
+def _session(): # one pooled, disk-cached HTTP session shared across reruns
+    s = requests_cache.CachedSession(
+        "wiki_cache",
+        backend="sqlite",
+        expire_after=3600,
+        urls_expire_after={"*/page/random/*": DO_NOT_CACHE},
+        cache_control=True,
+        stale_if_error=True,
+        allowable_codes=(200,),
+    )
+    s.headers.update({ #default headers
+        "User-Agent": "WikiCorkboard/1.1 (contact: your_email@example.com)",
+        "Accept": "application/json, text/html;q=0.9",
+        "Accept-Encoding": ACCEPT_ENCODING,
+    })
+    s.mount("https://", HTTPAdapter( # bigger keep-alive pool for concurrent fetches
+        pool_connections=4,
+        pool_maxsize=32,
+        max_retries=Retry(total=3, backoff_factor=1.5, status_forcelist=[429, 502, 503, 504],
+                          allowed_methods=["GET"], respect_retry_after_header=True),
+    ))
+    s.cache.delete(expired=True) # keep the sqlite file from growing forever
+    return s
+
+SESSION = _session()
+
+def _get(url, timeout=12): # GET helper, retries are handled by the adapter
+    r = SESSION.get(url, timeout=timeout)
+    r.raise_for_status()
+    return r
+
+def _json(r): # decode a JSON response body
+    return orjson.loads(r.content) if orjson is not None else r.json()
 
 def get_random_summary(): # get a random article summary (JSON)
     r = _get(f"{WIKI_REST}/page/random/summary")
-    return r.json()
+    return _json(r)
 
+@st.cache_data(ttl=3600, max_entries=512, show_spinner=False)
 def get_summary_by_title(title: str): # get article summary by specific title (JSON)
-    r = _get(f"{WIKI_REST}/page/summary/{quote(title)}")
-    return r.json()
+    r = _get(_SUMMARY_TPL.format(_qtitle(title)))
+    return _json(r)
 
 def search_title_best(query: str): # search helper for fuzzy matches
     try:
         r = _get("https://en.wikipedia.org/w/api.php"
                  f"?action=opensearch&limit=1&format=json&search={quote(query)}")
-        d = r.json()
+        d = _json(r)
         if d and d[1]:
             return d[1][0]
     except Exception:
@@ -58,7 +115,7 @@ def search_title_best(query: str): # search helper for fuzzy matches
     try:
         r = _get("https://en.wikipedia.org/w/api.php"
                  f"?action=query&list=search&srprop=&srlimit=1&format=json&srsearch={quote(query)}")
-        d = r.json()
+        d = _json(r)
         hits = d.get("query", {}).get("search", [])
         if hits:
             return hits[0]["title"]
@@ -75,76 +132,181 @@ def safe_get_summary(query_or_title: str): # wrapper with fallback
             raise
         return get_summary_by_title(best)
 
-def get_internal_links(title: str, max_links: int = 5): # get internal links from article given title
-    try:
-        html = _get(f"{WIKI_REST}/page/html/{quote(title)}")
-        soup = BeautifulSoup(html.text, "html.parser")
-        pairs = []
-        seen = set()
-        for a in soup.find_all("a", href=True):
-            href = a["href"].strip()
-            label = a.get_text(" ", strip=True)
-            if not label or len(label) < 2:
-                continue
-            if "redlink=1" in href:
-                continue
-            if href.startswith("/wiki/"):
-                tail = href.split("/wiki/", 1)[1]
-            elif href.startswith("./"):
-                tail = href[2:]
-            else:
-                continue
-            tail = tail.split("#", 1)[0].split("?", 1)[0]
-            if not tail:
-                continue
-            if ":" in tail:
-                continue
-            if tail == "Main_Page":
-                continue
-            decoded = unquote(tail)
-            if decoded.replace("_", " ").lower() == title.replace("_", " ").lower():
-                continue
-            if "new" in (a.get("class") or []):
-                continue
-            nice = label.replace("_", " ").strip()
-            if nice.lower() in {"edit", "citation needed", "help", "see also"}:
-                continue
-            if nice.isdigit():
-                continue
-            key = decoded.lower().replace("_", " ")
-            if key not in seen:
-                seen.add(key)
-                pairs.append((decoded, nice))
-            if len(pairs) >= max_links * 3:
-                break
-        random.shuffle(pairs)
-        if pairs:
-            return pairs[:max_links]
+def _lead_paragraph(text: str): # the note shows one paragraph, whichever API the text came from
+    return text.strip().split("\n", 1)[0]
+
+def get_summaries_bulk(titles): # {requested title: (title, extract, url)} in one round trip
+    r = _get("https://en.wikipedia.org/w/api.php"
+             "?action=query&format=json&formatversion=2&redirects=1"
+             "&prop=extracts|info&exintro=1&explaintext=1&inprop=url"
+             "&titles=" + "|".join(map(_qtitle, titles)))
+    q = _json(r).get("query", {})
+    normalized = {n["from"]: n["to"] for n in q.get("normalized", [])}
+    redirects = {n["from"]: n["to"] for n in q.get("redirects", [])}
+    pages = {p["title"]: p for p in q.get("pages", []) if "missing" not in p}
+    notes = {}
+    for t in titles:
+        name = normalized.get(t, t)
+        page = pages.get(redirects.get(name, name))
+        if not page or not page.get("extract"):
+            continue
+        url = page.get("fullurl", f"{WIKI_BASE}/wiki/{quote(page['title'])}")
+        notes[t] = (page["title"], _lead_paragraph(page["extract"]), url)
+    return notes
+
+def _iter_anchors(content: bytes): # yield (href, label, classes) for every <a href> in the article body
+    if LexborHTMLParser is not None:
+        tree = LexborHTMLParser(content)
+        for node in tree.css(_CHROME_CSS):
+            node.decompose()
+        for a in tree.css("section a[href]") or tree.css("a[href]"):
+            href = (a.attributes.get("href") or "").strip()
+            label = a.text(separator=" ", strip=True)
+            classes = (a.attributes.get("class") or "").split()
+            yield href, label, classes
+        return
+    if lxml is not None:
+        doc = lxml.html.fromstring(content)
+        for elem in doc.xpath(_CHROME_XPATH):
+            elem.drop_tree()
+        for root in doc.xpath("//body/section") or [doc]:
+            for elem, attr, href, _ in root.iterlinks():
+                if attr != "href" or elem.tag != "a":
+                    continue
+                label = " ".join(elem.text_content().split())
+                yield href.strip(), label, (elem.get("class") or "").split()
+        return
+    soup = BeautifulSoup(content, "html.parser", parse_only=SoupStrainer("section"))
+    for node in soup.select(_CHROME_CSS):
+        node.decompose()
+    for a in soup.find_all("a", href=True):
+        yield a["href"].strip(), a.get_text(" ", strip=True), a.get("class") or []
+
+def _button_label(nice: str): # truncate once here so the cached pool holds display-ready labels
+    return nice if len(nice) <= 29 else nice[:28] + "…"
+
+@st.cache_data(ttl=3600, max_entries=512, show_spinner=False)
+def get_link_pool(title: str, size: int = LEAD_POOL_SIZE): # deduped lead candidates, shuffled by the caller (cached)
+    try: # compact JSON link list first, Parsoid HTML only as a fallback
+        url = ("https://en.wikipedia.org/w/api.php"
+               f"?action=parse&page={_qtitle(title)}&redirects=1&prop=links&format=json&formatversion=2")
+        r = _get(url)
+        links = _json(r).get("parse", {}).get("links", [])
+        titles = [l["title"] for l in links if l.get("ns") == 0 and l.get("exists") and l.get("title")]
+        self_key = title.replace("_", " ").lower()
+        titles = [t for t in dict.fromkeys(titles) if t.lower() != self_key and t != "Main Page"]
+        if titles: # keep the cached pool bounded, like the reservoir below
+            return [(t, _button_label(t)) for t in random.sample(titles, min(size, len(titles)))]
     except Exception:
         pass
+    html = _get(_HTML_TPL.format(_qtitle(title)))
+    k = size
+    reservoir = [] # uniform sample of k leads from the whole page (algorithm R)
+    accepted = 0
+    seen = set()
+    self_key = title.replace("_", " ").lower()
+    for href, label, classes in _iter_anchors(html.content):
+        if not label or len(label) < 2:
+            continue
+        if "redlink=1" in href:
+            continue
+        m = _HREF_RE.match(href)
+        if not m:
+            continue
+        tail = m.group(1)
+        if tail == "Main_Page":
+            continue
+        decoded = unquote(tail)
+        key = decoded.lower().replace("_", " ") # one normalized key for the self check and dedup
+        if key == self_key:
+            continue
+        if "new" in classes:
+            continue
+        nice = label.replace("_", " ").strip()
+        if nice.lower() in _BAD_LABELS:
+            continue
+        if nice.isdigit():
+            continue
+        if key in seen:
+            continue
+        seen.add(key)
+        nice = _button_label(nice)
+        if accepted < k:
+            reservoir.append((decoded, nice))
+        else:
+            j = random.randrange(accepted + 1)
+            if j < k:
+                reservoir[j] = (decoded, nice)
+        accepted += 1
+    return reservoir
+
+def get_internal_links(title: str, max_links: int = LEAD_POOL_SIZE): # random sample of an article's internal links
     try:
-        url = ("https://en.wikipedia.org/w/api.php"
-               f"?action=parse&page={quote(title)}&prop=links&format=json")
-        r = _get(url)
-        data = r.json()
-        links = data.get("parse", {}).get("links", [])
-        titles = [l["*"] for l in links if l.get("ns") == 0 and l.get("*") and ("exists" in l)]
-        titles = list(dict.fromkeys(titles))
-        random.shuffle(titles)
-        return [(t, t.replace("_", " ")) for t in titles[:max_links]]
+        pool = get_link_pool(title)
     except Exception:
         return []
+    return random.sample(pool, min(max_links, len(pool)))
+
+@st.cache_resource
+def _prefetch_pool(): # one worker pool shared across reruns and sessions
+    return ThreadPoolExecutor(max_workers=8)
+
+def _submit(fn, *args): # run fn on the shared pool with this session's script context attached
+    ctx = get_script_run_ctx()
+    def task():
+        thread = threading.current_thread()
+        add_script_run_ctx(thread, ctx)
+        try:
+            return fn(*args)
+        finally: # the pool is shared across sessions, don't leave this one's context behind
+            setattr(thread, SCRIPT_RUN_CONTEXT_ATTR_NAME, None)
+    return _prefetch_pool().submit(task)
+
+def prefetch_leads(links): # warm the lead notes with one bulk request in the background
+    old = st.session_state.get("prefetch")
+    if old is not None:
+        old.cancel()
+    titles = [t for t, _ in links]
+    st.session_state.prefetch = _submit(get_summaries_bulk, titles) if titles else None
+
+def get_lead_note(title: str): # use the prefetched note if it's ready
+    fut = st.session_state.get("prefetch")
+    if fut is not None:
+        try:
+            note = fut.result(timeout=5).get(title)
+            if note:
+                return note
+        except Exception:
+            pass
+    return _page_note(title)
+
+def set_leads(pool): # keep the page's candidate pool and show a fresh handful from it
+    st.session_state.current_link_pool = pool
+    st.session_state.current_links = random.sample(pool, min(LEADS_SHOWN, len(pool)))
+    prefetch_leads(st.session_state.current_links)
+
+def _page_note(title: str): # note for a title, with fuzzy-search fallback
+    return note_from_summary(safe_get_summary(title))
+
+def fetch_page_bundle(title: str, get_note=_page_note): # fetch note and leads concurrently
+    links_fut = _submit(get_internal_links, title)
+    note = get_note(title)
+    if note[0] != title.replace("_", " "): # titles are case-sensitive past the first letter
+        links_fut.cancel() # resolved to a different page, its leads are the ones we want
+        return note, get_internal_links(note[0])
+    return note, links_fut.result()
 
 def note_from_summary(js): # extract title, extract, and URL from summary JSON
     title = js.get("title", "Untitled")
-    extract = js.get("extract", "(No summary available.)")
+    extract = _lead_paragraph(js.get("extract") or "") or "(No summary available.)"
     url = js.get("content_urls", {}).get("desktop", {}).get("page", f"{WIKI_BASE}/wiki/{quote(title)}")
     return title, extract, url
 
 st.set_page_config(page_title="Wiki Corkboard", page_icon="🧶", layout="centered")
 
-st.markdown(
-    """
+@st.cache_resource(show_spinner=False)
+def _css(): # static stylesheet, built once per server
+    return """
     <style>
     .note {
         display: block;
@@ -185,9 +347,9 @@ st.markdown(
     .toolbar .stButton>button { width: 100%; }
     .main-actions .stButton>button { width: 100%; height: 40px; }
     </style>
-    """,
-    unsafe_allow_html=True,
-)
+    """
+
+st.markdown(_css(), unsafe_allow_html=True)
 
 st.title("🧶 Wiki Corkboard (One-note view)")
 
@@ -208,7 +370,7 @@ with col1:
                 st.session_state.current = title
                 st.session_state.stack = [title]
                 st.session_state.current_data = (title, extract, url)
-                st.session_state.current_links = get_internal_links(title)
+                set_leads(get_internal_links(title))
         except Exception:
             st.error("Random fetch failed. Try again.")
     st.markdown('</div>', unsafe_allow_html=True)
@@ -220,12 +382,11 @@ with col2:
             try:
                 prev = st.session_state.stack[-2]
                 with st.spinner("Going back…"):
-                    js = safe_get_summary(prev)
-                    t, ex, u = note_from_summary(js)
+                    (t, ex, u), links = fetch_page_bundle(prev)
                     st.session_state.stack.pop()
                     st.session_state.current = t
                     st.session_state.current_data = (t, ex, u)
-                    st.session_state.current_links = get_internal_links(t)
+                    set_leads(links)
             except Exception:
                 st.error("Couldn't go back.")
     st.markdown('</div>', unsafe_allow_html=True)
@@ -239,14 +400,13 @@ with scol1:
     if st.button("🔎 Jump", disabled=not search_q.strip()):
         try:
             with st.spinner("Searching…"):
-                js = safe_get_summary(search_q.strip())
-                t, ex, u = note_from_summary(js)
+                (t, ex, u), links = fetch_page_bundle(search_q.strip())
                 st.session_state.current = t
                 st.session_state.stack.append(t)
                 if len(st.session_state.stack) > 200:
                     st.session_state.stack = st.session_state.stack[-200:]
                 st.session_state.current_data = (t, ex, u)
-                st.session_state.current_links = get_internal_links(t)
+                set_leads(links)
         except Exception:
             st.error("Couldn't find that article. Try a more exact title or different keywords.")
     st.markdown('</div>', unsafe_allow_html=True)
@@ -266,7 +426,7 @@ if not st.session_state.get("current"):
             st.session_state.current = title
             st.session_state.stack = [title]
             st.session_state.current_data = (title, extract, url)
-            st.session_state.current_links = get_internal_links(title)
+            set_leads(get_internal_links(title))
     except Exception:
         st.error("Startup fetch failed. Hit Random start.")
 
@@ -276,14 +436,8 @@ if st.session_state.get("stack"):
 
 # unified yellow note block
 title, extract, url = st.session_state.current_data
-html_block = f'''
-<div class="note">
-    <div class="title">{escape(title)}</div>
-    <div class="extract">{escape(extract)}</div>
-    <a href="{escape(url, quote=True)}" target="_blank" rel="noopener">Open on Wikipedia</a>
-</div>
-'''
-st.markdown(html_block, unsafe_allow_html=True)
+st.markdown(_NOTE_TPL.format(t=escape(title), e=escape(extract), u=escape(url, quote=True)),
+            unsafe_allow_html=True)
 
 st.write("")
 
@@ -292,9 +446,9 @@ links = st.session_state.current_links
 if not links:
     st.info("No links found on this page. Hit **Random start** or **Back**.")
 else:
-    items = links[:5]
+    items = links[:LEADS_SHOWN]
     n = len(items)
-    total_cols = 5
+    total_cols = LEADS_SHOWN
     left_pad = (total_cols - n) // 2
     cols = st.columns([1] * total_cols)
 
@@ -302,27 +456,25 @@ else:
         with cols[idx]:
             k = idx - left_pad
             if 0 <= k < n:
-                next_title, nice_label = items[k]
-                label = (nice_label[:28] + "…") if len(nice_label) > 29 else nice_label
+                next_title, label = items[k]
                 if st.button(label, key=f"lead_{k}"):
                     try:
                         with st.spinner("Following lead…"):
-                            js2 = safe_get_summary(next_title)
-                            t2, ex2, u2 = note_from_summary(js2)
+                            (t2, ex2, u2), links2 = fetch_page_bundle(next_title, get_lead_note)
                             st.session_state.current = t2
                             st.session_state.stack.append(t2)
                             if len(st.session_state.stack) > 200:
                                 st.session_state.stack = st.session_state.stack[-200:]
                             st.session_state.current_data = (t2, ex2, u2)
-                            st.session_state.current_links = get_internal_links(t2)
+                            set_leads(links2)
                     except Exception:
                         st.error("That lead fizzled. Try another.")
             else:
                 st.write("")
 
-if st.button("Shuffle leads 🔀"):
-    try:
+if st.button("Shuffle leads 🔀"): # resample the stored pool, refetch only if it came back empty
+    pool = st.session_state.get("current_link_pool")
+    if not pool and st.session_state.get("current"):
         with st.spinner("Shuffling…"):
-            st.session_state.current_links = get_internal_links(st.session_state.current)
-    except Exception:
-        st.error("Shuffle failed. Try again.")
+            pool = get_internal_links(st.session_state.current)
+    set_leads(pool or [])